@@ -3,15 +3,18 @@ Palm Oil Sourcing Optimization - Streamlit App
 Interactive dashboard using precomputed optimization results
 """
 
+import io
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import json
-import pickle
+import msgspec
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 from datetime import datetime
+from pathlib import Path
+from scipy.spatial import cKDTree
+from schemas import MetadataSchema, DetailedResult, Scenario, SCENARIO_DTYPES
 
 # Page configuration
 st.set_page_config(
@@ -53,225 +56,256 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 @st.cache_data
-def load_precomputed_data():
-    """Load all precomputed data files."""
+def load_scenarios():
+    """Load the precomputed scenarios summary."""
     try:
-        # Load scenarios summary
-        scenarios_df = pd.read_csv('precomputed_results/precomputed_scenarios_summary.csv')
-        
-        # Load detailed results
-        with open('precomputed_results/precomputed_detailed_results.json', 'r') as f:
-            detailed_results = json.load(f)
-        
-        # Load metadata
-        with open('precomputed_results/precomputed_metadata.pkl', 'rb') as f:
-            metadata = pickle.load(f)
-        
-        # Load supplier allocations if available
-        try:
-            allocations_df = pd.read_parquet('precomputed_results/precomputed_supplier_allocations.parquet')
-        except:
-            allocations_df = None
+        scenarios_df = pd.read_parquet('precomputed_results/precomputed_scenarios_summary.parquet')
+        return scenarios_df.astype(SCENARIO_DTYPES)
+    
+    except Exception as e:
+        st.error(f"Error loading precomputed scenarios: {str(e)}")
+        return None
+
+@st.cache_resource
+def load_detailed():
+    """Load the precomputed detailed results (shared read-only, not copied per call)."""
+    try:
+        msgpack_path = Path('precomputed_results/precomputed_detailed_results.msgpack')
+        if msgpack_path.exists():
+            return msgspec.msgpack.decode(msgpack_path.read_bytes(), type=list[DetailedResult])
         
-        return scenarios_df, detailed_results, metadata, allocations_df
+        # Fall back to the JSON file written by earlier versions of the precomputation
+        # (orjson is only needed for these legacy files, so it is imported here)
+        import orjson
+        with open('precomputed_results/precomputed_detailed_results.json', 'rb') as f:
+            detailed_results = orjson.loads(f.read())
+        for result in detailed_results:
+            # Older files store final_plan as a list of rows rather than columns
+            plan = result.get('final_plan') or []
+            result['final_plan'] = {key: [row[key] for row in plan] for key in (plan[0] if plan else {})}
+        return msgspec.convert(detailed_results, type=list[DetailedResult])
+    
+    except Exception as e:
+        st.error(f"Error loading precomputed detailed results: {str(e)}")
+        return None
+
+@st.cache_data
+def load_metadata():
+    """Load the precomputed metadata."""
+    try:
+        return msgspec.msgpack.decode(
+            Path('precomputed_results/precomputed_metadata.msgpack').read_bytes(),
+            type=MetadataSchema
+        )
     
     except Exception as e:
-        st.error(f"Error loading precomputed data: {str(e)}")
-        return None, None, None, None
+        st.error(f"Error loading precomputed metadata: {str(e)}")
+        return None
 
-def get_available_parameters(scenarios_df):
-    """Extract available parameter values from the data."""
+def get_available_parameters(metadata):
+    """Extract available parameter values from the precomputed parameter grid."""
+    grid = metadata.parameters
     return {
-        'volumes': sorted(scenarios_df['volume'].unique()),
-        'risk_weights': sorted(scenarios_df['risk_weight'].unique()),
-        'max_shares': sorted(scenarios_df['max_share'].unique()),
-        'min_suppliers': sorted(scenarios_df['min_supplier'].unique())
+        'volumes': sorted(grid.volumes),
+        'risk_weights': sorted(grid.risk_weights),
+        'max_shares': sorted(grid.max_shares),
+        'min_suppliers': sorted(grid.min_suppliers)
     }
 
+def build_kdtree(volumes, risk_weights):
+    """Build a KD-tree over (volume, risk_weight) points, weighting risk more heavily."""
+    return cKDTree(np.column_stack([volumes, np.asarray(risk_weights) * 1000]))
+
+@st.cache_resource
+def scenario_arrays(_scenarios_df):
+    """Extract the parameter columns of the scenarios table as NumPy arrays."""
+    return (
+        _scenarios_df['volume'].to_numpy(),
+        _scenarios_df['risk_weight'].to_numpy(),
+        _scenarios_df['max_share'].to_numpy(),
+        _scenarios_df['min_supplier'].to_numpy()
+    )
+
+@st.cache_resource
+def build_trees(_scenarios_df):
+    """Build a KD-tree of scenarios for each (max_share, min_supplier) bucket."""
+    trees = {}
+    for key, sub in _scenarios_df.groupby(['max_share', 'min_supplier']):
+        trees[key] = (build_kdtree(sub['volume'].to_numpy(), sub['risk_weight'].to_numpy()), sub.index.to_numpy())
+    return trees
+
+def to_scenario(row):
+    """Convert a scenarios summary row into a Scenario tuple of builtin values."""
+    values = row.to_dict()
+    return Scenario(*(values.get(field) for field in Scenario._fields))
+
 def find_matching_scenario(scenarios_df, volume, risk_weight, max_share, min_supplier):
     """Find the scenario that matches the selected parameters."""
-    # First try exact match
-    mask = (
-        (scenarios_df['volume'] == volume) &
-        (scenarios_df['risk_weight'] == risk_weight) &
-        (scenarios_df['max_share'] == max_share) &
-        (scenarios_df['min_supplier'] == min_supplier)
-    )
-    
-    matching_scenarios = scenarios_df[mask]
-    if len(matching_scenarios) > 0:
-        return matching_scenarios.iloc[0]
-    
-    # If no exact match, find closest volume and risk_weight
-    scenarios_df['volume_diff'] = abs(scenarios_df['volume'] - volume)
-    scenarios_df['risk_diff'] = abs(scenarios_df['risk_weight'] - risk_weight)
-    
-    # Filter by exact matches for max_share and min_supplier
-    filtered_df = scenarios_df[
-        (scenarios_df['max_share'] == max_share) &
-        (scenarios_df['min_supplier'] == min_supplier)
-    ]
-    
-    if len(filtered_df) > 0:
-        # Find closest match by volume and risk_weight
-        closest_idx = filtered_df['volume_diff'].add(filtered_df['risk_diff']).idxmin()
-        return scenarios_df.loc[closest_idx]
+    vol, rw, ms, msup = scenario_arrays(scenarios_df)
     
+    # First try exact match
+    exact = np.flatnonzero((ms == max_share) & (msup == min_supplier) & (vol == volume) & (rw == risk_weight))
+    if len(exact) > 0:
+        return to_scenario(scenarios_df.iloc[exact[0]])
+    
+    # If no exact match, find closest volume and risk_weight among scenarios
+    # with the same max_share and min_supplier
+    bucket = build_trees(scenarios_df).get((max_share, min_supplier))
+    if bucket is None:
         return None
+    
+    tree, index = bucket
+    _, nearest = tree.query([volume, risk_weight * 1000], p=1)
+    return to_scenario(scenarios_df.loc[index[nearest]])
+
+@st.cache_resource
+def index_detailed(_detailed_results):
+    """Index detailed results by parameter tuple and build a KD-tree per (max_share, min_supplier) bucket."""
+    exact = {}
+    by_ms = {}
+    for result in _detailed_results:
+        params = result.parameters
+        exact[(params.volume, params.risk_weight, params.max_share, params.min_supplier)] = result
+        by_ms.setdefault((params.max_share, params.min_supplier), []).append(result)
+    trees = {
+        key: (
+            build_kdtree([r.parameters.volume for r in results], [r.parameters.risk_weight for r in results]),
+            results
+        )
+        for key, results in by_ms.items()
+    }
+    return exact, trees
 
 def get_detailed_result(detailed_results, volume, risk_weight, max_share, min_supplier):
     """Get detailed result for the selected parameters."""
+    exact, trees = index_detailed(detailed_results)
+    
     # First try exact match
-    for result in detailed_results:
-        params = result['parameters']
-        if (params['volume'] == volume and 
-            params['risk_weight'] == risk_weight and 
-            params['max_share'] == max_share and 
-            params['min_supplier'] == min_supplier):
-            return result
-    
-    # If no exact match, find closest match
-    best_result = None
-    min_distance = float('inf')
-    
-    for result in detailed_results:
-        params = result['parameters']
-        if (params['max_share'] == max_share and 
-            params['min_supplier'] == min_supplier):
-            # Calculate distance based on volume and risk_weight
-            volume_diff = abs(params['volume'] - volume)
-            risk_diff = abs(params['risk_weight'] - risk_weight)
-            total_distance = volume_diff + risk_diff * 1000  # Weight risk more heavily
-            
-            if total_distance < min_distance:
-                min_distance = total_distance
-                best_result = result
+    result = exact.get((volume, risk_weight, max_share, min_supplier))
+    if result is not None:
+        return result
     
-    return best_result
-
-def create_cost_comparison_chart(scenario):
-    """Create a cost comparison chart."""
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        name='Baseline',
-        x=['Cost'],
-        y=[scenario['baseline_cost']],
-        marker_color='lightcoral',
-        text=[f"{scenario['baseline_cost']:.0f}"],
-        textposition='auto'
-    ))
-    
-    fig.add_trace(go.Bar(
-        name='Optimized',
-        x=['Cost'],
-        y=[scenario['optimized_cost']],
-        marker_color='lightgreen',
-        text=[f"{scenario['optimized_cost']:.0f}"],
-        textposition='auto'
-    ))
-    
-    fig.update_layout(
-        title="Cost Comparison (per tonne)",
-        xaxis_title="",
-        yaxis_title="Cost ($)",
-        barmode='group',
-        height=400,
-        showlegend=True,
-        margin=dict(l=50, r=50, t=50, b=50)
-    )
+    # If no exact match, find closest match within the same supplier settings
+    bucket = trees.get((max_share, min_supplier))
+    if bucket is None:
+        return None
     
-    return fig
+    tree, results = bucket
+    _, nearest = tree.query([volume, risk_weight * 1000], p=1)
+    return results[nearest]
 
-def create_emissions_comparison_chart(scenario):
-    """Create an emissions comparison chart."""
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        name='Baseline',
-        x=['Emissions'],
-        y=[scenario['baseline_emissions']],
-        marker_color='lightcoral',
-        text=[f"{scenario['baseline_emissions']:.3f}"],
-        textposition='auto'
-    ))
-    
-    fig.add_trace(go.Bar(
-        name='Optimized',
-        x=['Emissions'],
-        y=[scenario['optimized_emissions']],
-        marker_color='lightgreen',
-        text=[f"{scenario['optimized_emissions']:.3f}"],
-        textposition='auto'
-    ))
-    
-    fig.update_layout(
-        title="Emissions Comparison (KPI)",
-        xaxis_title="",
-        yaxis_title="Emissions KPI",
-        barmode='group',
-        height=400,
-        showlegend=False,
-        margin=dict(l=50, r=50, t=50, b=50)
-    )
-    
-    return fig
+@st.cache_data(ttl=None, max_entries=256)
+def lookup(_scenarios_df, volume, risk_weight, max_share, min_supplier):
+    """Look up the scenario for a parameter tuple."""
+    return find_matching_scenario(_scenarios_df, volume, risk_weight, max_share, min_supplier)
 
-def create_deforestation_comparison_chart(scenario):
-    """Create a deforestation comparison chart."""
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        name='Baseline',
-        x=['Deforestation'],
-        y=[scenario['baseline_deforestation']],
-        marker_color='lightcoral',
-        text=[f"{scenario['baseline_deforestation']:.5f}"],
-        textposition='auto'
-    ))
-    
-    fig.add_trace(go.Bar(
-        name='Optimized',
-        x=['Deforestation'],
-        y=[scenario['optimized_deforestation']],
-        marker_color='lightgreen',
-        text=[f"{scenario['optimized_deforestation']:.5f}"],
-        textposition='auto'
-    ))
-    
-    fig.update_layout(
-        title="Deforestation Comparison (KPI)",
-        xaxis_title="",
-        yaxis_title="Deforestation KPI",
-        barmode='group',
-        height=400,
-        showlegend=False,
-        margin=dict(l=50, r=50, t=50, b=50)
-    )
+@st.cache_data(ttl=None, max_entries=256)
+def lookup_detailed(volume, risk_weight, max_share, min_supplier):
+    """Look up the detailed result for a parameter tuple, loading detailed results on first use."""
+    detailed_results = load_detailed()
+    if detailed_results is None:
+        return None
+    return get_detailed_result(detailed_results, volume, risk_weight, max_share, min_supplier)
+
+def create_comparison_subplots(scenario):
+    """Create side-by-side cost, emissions and deforestation comparison charts as a figure dict."""
+    values = np.array([
+        [scenario.baseline_cost, scenario.optimized_cost],
+        [scenario.baseline_emissions, scenario.optimized_emissions],
+        [scenario.baseline_deforestation, scenario.optimized_deforestation]
+    ])
+    texts = [
+        [scenario.baseline_cost_str, scenario.optimized_cost_str],
+        [scenario.baseline_emissions_str, scenario.optimized_emissions_str],
+        [scenario.baseline_deforestation_str, scenario.optimized_deforestation_str]
+    ]
+    panels = [
+        ('Cost', 'Cost Comparison (per tonne)', 'Cost ($)'),
+        ('Emissions', 'Emissions Comparison (KPI)', 'Emissions KPI'),
+        ('Deforestation', 'Deforestation Comparison (KPI)', 'Deforestation KPI')
+    ]
+    # Same panel layout make_subplots(rows=1, cols=3) produces
+    domains = [[0.0, 0.2889], [0.3556, 0.6444], [0.7111, 1.0]]
+    
+    data = []
+    layout = {
+        'barmode': 'group',
+        'height': 400,
+        'showlegend': True,
+        'margin': {'l': 50, 'r': 50, 't': 50, 'b': 50},
+        'annotations': []
+    }
     
-    return fig
+    for i, (label, title, yaxis_title) in enumerate(panels):
+        suffix = '' if i == 0 else str(i + 1)
+        for (name, color), value, text in zip([('Baseline', 'lightcoral'), ('Optimized', 'lightgreen')], values[i], texts[i]):
+            data.append({
+                'type': 'bar',
+                'name': name,
+                'x': [label],
+                'y': [float(value)],
+                'marker': {'color': color},
+                'text': [text],
+                'textposition': 'auto',
+                'legendgroup': name,
+                'showlegend': i == 0,
+                'xaxis': f'x{suffix}',
+                'yaxis': f'y{suffix}'
+            })
+        layout[f'xaxis{suffix}'] = {'domain': domains[i], 'anchor': f'y{suffix}'}
+        layout[f'yaxis{suffix}'] = {'anchor': f'x{suffix}', 'title': {'text': yaxis_title}}
+        layout['annotations'].append({
+            'text': title,
+            'x': sum(domains[i]) / 2,
+            'y': 1.0,
+            'xref': 'paper',
+            'yref': 'paper',
+            'xanchor': 'center',
+            'yanchor': 'bottom',
+            'showarrow': False,
+            'font': {'size': 16}
+        })
+    
+    return {'data': data, 'layout': layout}
 
-def create_supplier_allocation_chart(detailed_result):
-    """Create a chart showing supplier allocations."""
-    if not detailed_result or detailed_result['status'] != 'completed':
+def create_supplier_allocation_chart(final_plan, top_n=30):
+    """Create a chart showing the top_n supplier allocations as a figure dict."""
+    if final_plan.empty:
         return None
     
-    final_plan = pd.DataFrame(detailed_result['final_plan'])
+    # Keep the largest suppliers and aggregate the rest into a single bar
+    if len(final_plan) > top_n:
+        head = final_plan.nlargest(top_n - 1, 'Volume_Sourced')
+        tail = final_plan.drop(head.index)
+        other = pd.DataFrame({
+            'exporter_group': [f"Other ({len(tail)} suppliers)"],
+            'Volume_Sourced': [tail['Volume_Sourced'].sum()]
+        })
+        final_plan = pd.concat([head[['exporter_group', 'Volume_Sourced']], other], ignore_index=True)
     
     # Sort by volume sourced
     final_plan = final_plan.sort_values('Volume_Sourced', ascending=True)
     
-    fig = px.bar(
-        final_plan, 
-        x='Volume_Sourced', 
-        y='exporter_group',
-        orientation='h',
-        title="Supplier Allocations",
-        labels={'Volume_Sourced': 'Volume Sourced (tonnes)', 'exporter_group': 'Supplier'}
-    )
-    
-    fig.update_layout(height=600, yaxis={'categoryorder': 'total ascending'})
-    return fig
+    return {
+        'data': [{
+            'type': 'bar',
+            'orientation': 'h',
+            'x': final_plan['Volume_Sourced'].tolist(),
+            'y': final_plan['exporter_group'].tolist(),
+            'hovertemplate': 'Volume Sourced (tonnes)=%{x}<br>Supplier=%{y}<extra></extra>'
+        }],
+        'layout': {
+            'title': {'text': "Supplier Allocations"},
+            'height': 600,
+            'xaxis': {'title': {'text': 'Volume Sourced (tonnes)'}},
+            'yaxis': {'title': {'text': 'Supplier'}, 'categoryorder': 'total ascending'}
+        }
+    }
+
+@st.cache_data(ttl=None, max_entries=256)
+def build_comparison_figure(scenario):
+    """Build the comparison subplots as a Plotly figure dict."""
+    return create_comparison_subplots(scenario)
 
 def main():
     # Header
@@ -279,9 +313,10 @@ def main():
     
     # Load data
     with st.spinner("Loading precomputed data..."):
-        scenarios_df, detailed_results, metadata, allocations_df = load_precomputed_data()
+        scenarios_df = load_scenarios()
+        metadata = load_metadata()
     
-    if scenarios_df is None:
+    if scenarios_df is None or metadata is None:
         st.error("Failed to load precomputed data. Please ensure the precomputed_results folder exists.")
         return
     
@@ -289,48 +324,61 @@ def main():
     st.sidebar.header("🎛️ Parameter Selection")
     
     # Get available parameters
-    params = get_available_parameters(scenarios_df)
-    
-    # Create sliders and radio buttons
-    st.sidebar.markdown("### 📊 Volume & Risk Settings")
-    selected_volume = st.sidebar.slider(
-        "Volume Required (tonnes)",
-        min_value=min(params['volumes']),
-        max_value=max(params['volumes']),
-        value=200000,
-        step=50000,
-        help="Total volume of palm oil to source",
-        format="%d"
-    )
-    
-    selected_risk_weight = st.sidebar.slider(
-        "Sustainability Weight",
-        min_value=min(params['risk_weights']),
-        max_value=max(params['risk_weights']),
-        value=1.0,
-        step=0.25,
-        help="Weight given to risk factors (0 = no risk consideration, 1 = full risk consideration)",
-        format="%.2f"
-    )
-    
-    st.sidebar.markdown("### 🏢 Supplier Settings")
-    selected_max_share = st.sidebar.select_slider(
-        "Max Share per Supplier",
-        options=params['max_shares'],
-        value=0.5 if 0.5 in params['max_shares'] else params['max_shares'][0],
-        help="Maximum percentage of total volume any single supplier can provide",
-        format_func=lambda x: f"{x*100:.0f}%"
-    )
-    
-    selected_min_suppliers = st.sidebar.select_slider(
-        "Minimum Number of Suppliers",
-        options=params['min_suppliers'],
-        value=6 if 6 in params['min_suppliers'] else params['min_suppliers'][0],
-        help="Minimum number of suppliers to include in the sourcing plan"
-    )
+    params = get_available_parameters(metadata)
+    
+    # Create sliders and radio buttons inside a form so changes are applied together
+    with st.sidebar.form("params"):
+        st.markdown("### 📊 Volume & Risk Settings")
+        selected_volume = st.slider(
+            "Volume Required (tonnes)",
+            min_value=min(params['volumes']),
+            max_value=max(params['volumes']),
+            value=200000,
+            step=50000,
+            help="Total volume of palm oil to source",
+            format="%d"
+        )
+        
+        selected_risk_weight = st.slider(
+            "Sustainability Weight",
+            min_value=min(params['risk_weights']),
+            max_value=max(params['risk_weights']),
+            value=1.0,
+            step=0.25,
+            help="Weight given to risk factors (0 = no risk consideration, 1 = full risk consideration)",
+            format="%.2f"
+        )
+        
+        st.markdown("### 🏢 Supplier Settings")
+        selected_max_share = st.select_slider(
+            "Max Share per Supplier",
+            options=params['max_shares'],
+            value=0.5 if 0.5 in params['max_shares'] else params['max_shares'][0],
+            help="Maximum percentage of total volume any single supplier can provide",
+            format_func=lambda x: f"{x*100:.0f}%"
+        )
+        
+        selected_min_suppliers = st.select_slider(
+            "Minimum Number of Suppliers",
+            options=params['min_suppliers'],
+            value=6 if 6 in params['min_suppliers'] else params['min_suppliers'][0],
+            help="Minimum number of suppliers to include in the sourcing plan"
+        )
+        
+        st.markdown("### 📈 Chart Settings")
+        selected_top_n = st.slider(
+            "Suppliers Shown in Allocation Chart",
+            min_value=5,
+            max_value=50,
+            value=30,
+            step=5,
+            help="Largest suppliers drawn individually; the remaining ones are grouped into a single 'Other' bar"
+        )
+        
+        st.form_submit_button("Apply", use_container_width=True)
     
     # Find matching scenario
-    scenario = find_matching_scenario(
+    scenario = lookup(
         scenarios_df, selected_volume, selected_risk_weight, 
         selected_max_share, selected_min_suppliers
     )
@@ -341,17 +389,17 @@ def main():
     
     # Check if we're using exact match or closest match
     exact_match = (
-        scenario['volume'] == selected_volume and 
-        scenario['risk_weight'] == selected_risk_weight
+        scenario.volume == selected_volume and 
+        scenario.risk_weight == selected_risk_weight
     )
     
     if not exact_match:
-        st.info(f"📊 Showing results for closest match: Volume={scenario['volume']:,} tonnes, Risk Weight={scenario['risk_weight']}")
+        st.info(f"📊 Showing results for closest match: Volume={scenario.volume:,} tonnes, Risk Weight={scenario.risk_weight}")
     
-    if scenario['status'] != 'completed':
-        st.error(f"Selected scenario has status: {scenario['status']}")
-        if 'error' in scenario:
-            st.error(f"Error: {scenario['error']}")
+    if scenario.status != 'completed':
+        st.error(f"Selected scenario has status: {scenario.status}")
+        if scenario.error is not None:
+            st.error(f"Error: {scenario.error}")
         return
     
     # Main content area
@@ -361,98 +409,90 @@ def main():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        cost_change = scenario['optimized_cost'] - scenario['baseline_cost']
-        cost_improvement = ((scenario['baseline_cost'] - scenario['optimized_cost']) / scenario['baseline_cost']) * 100
+        cost_improvement = scenario.cost_improvement_pct
         st.markdown("**Cost Improvement**")
-        if cost_change < 0:  # Cost went down (good)
+        if cost_improvement > 0:  # Cost went down (good)
             st.markdown(f"<h2 style='color: green;'>{cost_improvement:.1f}%</h2>", unsafe_allow_html=True)
-            st.caption(f"↓ {scenario['baseline_cost']:.0f} → {scenario['optimized_cost']:.0f}")
+            st.caption(f"↓ {scenario.baseline_cost_str} → {scenario.optimized_cost_str}")
         else:  # Cost went up (bad)
             st.markdown(f"<h2 style='color: red;'>+{abs(cost_improvement):.1f}%</h2>", unsafe_allow_html=True)
-            st.caption(f"↑ {scenario['baseline_cost']:.0f} → {scenario['optimized_cost']:.0f}")
+            st.caption(f"↑ {scenario.baseline_cost_str} → {scenario.optimized_cost_str}")
     
     with col2:
-        emissions_change = scenario['optimized_emissions'] - scenario['baseline_emissions']
-        emissions_improvement = ((scenario['baseline_emissions'] - scenario['optimized_emissions']) / scenario['baseline_emissions']) * 100
+        emissions_improvement = scenario.emissions_improvement_pct
         st.markdown("**Emissions Reduction**")
-        if emissions_change < 0:  # Emissions went down (good)
+        if emissions_improvement > 0:  # Emissions went down (good)
             st.markdown(f"<h2 style='color: green;'>{emissions_improvement:.1f}%</h2>", unsafe_allow_html=True)
-            st.caption(f"↓ {scenario['baseline_emissions']:.3f} → {scenario['optimized_emissions']:.3f}")
+            st.caption(f"↓ {scenario.baseline_emissions_str} → {scenario.optimized_emissions_str}")
         else:  # Emissions went up (bad)
             st.markdown(f"<h2 style='color: red;'>+{abs(emissions_improvement):.1f}%</h2>", unsafe_allow_html=True)
-            st.caption(f"↑ {scenario['baseline_emissions']:.3f} → {scenario['optimized_emissions']:.3f}")
+            st.caption(f"↑ {scenario.baseline_emissions_str} → {scenario.optimized_emissions_str}")
         
     with col3:
-        deforestation_change = scenario['optimized_deforestation'] - scenario['baseline_deforestation']
-        deforestation_improvement = ((scenario['baseline_deforestation'] - scenario['optimized_deforestation']) / scenario['baseline_deforestation']) * 100
+        deforestation_improvement = scenario.deforestation_improvement_pct
         st.markdown("**Deforestation Reduction**")
-        if deforestation_change < 0:  # Deforestation went down (good)
+        if deforestation_improvement > 0:  # Deforestation went down (good)
             st.markdown(f"<h2 style='color: green;'>{deforestation_improvement:.1f}%</h2>", unsafe_allow_html=True)
-            st.caption(f"↓ {scenario['baseline_deforestation']:.5f} → {scenario['optimized_deforestation']:.5f}")
+            st.caption(f"↓ {scenario.baseline_deforestation_str} → {scenario.optimized_deforestation_str}")
         else:  # Deforestation went up (bad)
             st.markdown(f"<h2 style='color: red;'>+{abs(deforestation_improvement):.1f}%</h2>", unsafe_allow_html=True)
-            st.caption(f"↑ {scenario['baseline_deforestation']:.5f} → {scenario['optimized_deforestation']:.5f}")
+            st.caption(f"↑ {scenario.baseline_deforestation_str} → {scenario.optimized_deforestation_str}")
     
     with col4:
         st.markdown("**Suppliers Used**")
-        st.markdown(f"<h2 style='color: #1f77b4;'>{scenario['supplier_count']}</h2>", unsafe_allow_html=True)
-        st.caption(f"Volume: {scenario['total_volume_sourced']:,.0f} tonnes")
+        st.markdown(f"<h2 style='color: #1f77b4;'>{scenario.supplier_count}</h2>", unsafe_allow_html=True)
+        st.caption(f"Volume: {scenario.total_volume_sourced:,.0f} tonnes")
     
     # Charts section
     st.header("📈 Performance Comparison")
     
-    # Create three separate charts horizontally aligned
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        fig_cost = create_cost_comparison_chart(scenario)
-        st.plotly_chart(fig_cost, use_container_width=True)
-    
-    with col2:
-        fig_emissions = create_emissions_comparison_chart(scenario)
-        st.plotly_chart(fig_emissions, use_container_width=True)
-    
-    with col3:
-        fig_deforestation = create_deforestation_comparison_chart(scenario)
-        st.plotly_chart(fig_deforestation, use_container_width=True)
+    # Cost, emissions and deforestation charts as one subplot figure
+    fig_comparison = build_comparison_figure(scenario)
+    st.plotly_chart(fig_comparison, use_container_width=True)
     
     # Get detailed result for supplier allocations
-    detailed_result = get_detailed_result(
-        detailed_results, selected_volume, selected_risk_weight, 
-        selected_max_share, selected_min_suppliers
-    )
+    with st.spinner("Loading supplier allocations..."):
+        detailed_result = lookup_detailed(
+            selected_volume, selected_risk_weight, 
+            selected_max_share, selected_min_suppliers
+        )
     
-    if detailed_result and detailed_result['status'] == 'completed':
+    if detailed_result and detailed_result.status == 'completed':
         st.header("🏢 Supplier Insights")
         tab_alloc, tab_details = st.tabs(["Supplier Allocations", "Detailed Supplier Information"]) 
+        allocations = pa.table(detailed_result.final_plan)
 
         with tab_alloc:
             st.subheader("Supplier Allocations")
             # Supplier allocation chart
-            fig_allocations = create_supplier_allocation_chart(detailed_result)
+            final_plan = allocations.select(['exporter_group', 'Volume_Sourced']).to_pandas()
+            fig_allocations = create_supplier_allocation_chart(final_plan, selected_top_n)
             if fig_allocations:
                 st.plotly_chart(fig_allocations, use_container_width=True)
 
         with tab_details:
             st.subheader("Detailed Supplier Information")
-            final_plan = pd.DataFrame(detailed_result['final_plan'])
-            
-            # Format the dataframe for display
-            display_df = final_plan[['exporter_group', 'Volume_Sourced', 'final_score', 
-                                    'avg_cost_per_tonne', 'avg_emissions_kpi', 'avg_deforestation_kpi']].copy()
-            display_df.columns = ['Supplier', 'Volume Sourced (tonnes)', 'Final Score', 
-                                 'Avg Cost per Tonne', 'Avg Emissions KPI', 'Avg Deforestation KPI']
             
-            # Round numeric columns
-            numeric_cols = ['Volume Sourced (tonnes)', 'Final Score', 'Avg Cost per Tonne', 
-                           'Avg Emissions KPI', 'Avg Deforestation KPI']
-            for col in numeric_cols:
-                display_df[col] = display_df[col].round(4)
+            # Format the table for display, rounding numeric columns
+            display_columns = {
+                'exporter_group': 'Supplier',
+                'Volume_Sourced': 'Volume Sourced (tonnes)',
+                'final_score': 'Final Score',
+                'avg_cost_per_tonne': 'Avg Cost per Tonne',
+                'avg_emissions_kpi': 'Avg Emissions KPI',
+                'avg_deforestation_kpi': 'Avg Deforestation KPI'
+            }
+            display_table = pa.table({
+                label: allocations[col] if col == 'exporter_group' else pc.round(allocations[col], 4)
+                for col, label in display_columns.items()
+            })
             
-            st.dataframe(display_df, use_container_width=True)
+            st.dataframe(display_table, use_container_width=True)
             
             # Download button for results
-            csv = display_df.to_csv(index=False)
+            csv_buffer = io.BytesIO()
+            pa_csv.write_csv(display_table, csv_buffer)
+            csv = csv_buffer.getvalue()
             st.download_button(
                 label="📥 Download Supplier Allocations (CSV)",
                 data=csv,
@@ -474,11 +514,11 @@ def main():
     
     with col2:
         st.subheader("Optimization Results")
-        st.write(f"**Total Volume Sourced:** {scenario['total_volume_sourced']:,.0f} tonnes")
-        st.write(f"**Number of Suppliers:** {scenario['supplier_count']}")
-        st.write(f"**Average Cost per Tonne:** {scenario['optimized_cost']:.2f}")
-        st.write(f"**Average Emissions KPI:** {scenario['optimized_emissions']:.4f}")
-        st.write(f"**Average Deforestation KPI:** {scenario['optimized_deforestation']:.6f}")
+        st.write(f"**Total Volume Sourced:** {scenario.total_volume_sourced:,.0f} tonnes")
+        st.write(f"**Number of Suppliers:** {scenario.supplier_count}")
+        st.write(f"**Average Cost per Tonne:** {scenario.optimized_cost:.2f}")
+        st.write(f"**Average Emissions KPI:** {scenario.optimized_emissions:.4f}")
+        st.write(f"**Average Deforestation KPI:** {scenario.optimized_deforestation:.6f}")
     
 
    
@@ -0,0 +1,92 @@
+"""
+Schemas for the precomputed result files
+Kept outside app.py so cached objects keep a stable class across Streamlit reruns
+"""
+
+from typing import NamedTuple
+
+import msgspec
+
+# Column dtypes of the scenarios summary table. risk_weight and max_share stay
+# float64 because they are matched exactly against the detailed results.
+SCENARIO_DTYPES = {
+    'volume': 'int32',
+    'min_supplier': 'int32',
+    'supplier_count': 'Int32',  # missing for scenarios that failed
+    'baseline_cost': 'float32',
+    'optimized_cost': 'float32',
+    'baseline_emissions': 'float32',
+    'optimized_emissions': 'float32',
+    'baseline_deforestation': 'float32',
+    'optimized_deforestation': 'float32',
+    'total_volume_sourced': 'float32',
+    'cost_improvement_pct': 'float32',
+    'emissions_improvement_pct': 'float32',
+    'deforestation_improvement_pct': 'float32'
+}
+
+# Display formats of the metric columns, rendered into <column>_str columns
+# when the scenarios summary is written
+METRIC_FORMATS = {
+    'baseline_cost': '.0f',
+    'optimized_cost': '.0f',
+    'baseline_emissions': '.3f',
+    'optimized_emissions': '.3f',
+    'baseline_deforestation': '.5f',
+    'optimized_deforestation': '.5f'
+}
+
+class ParameterGrid(msgspec.Struct):
+    """Parameter values the optimization was precomputed for."""
+    volumes: list[int]
+    risk_weights: list[float]
+    max_shares: list[float]
+    min_suppliers: list[int]
+
+class MetadataSchema(msgspec.Struct):
+    """Schema of precomputed_metadata.msgpack."""
+    created_at: str
+    total_combinations: int
+    parameters: ParameterGrid
+
+class ScenarioParameters(msgspec.Struct):
+    """Parameter combination a detailed result was computed for."""
+    volume: int
+    risk_weight: float
+    max_share: float
+    min_supplier: int
+
+class DetailedResult(msgspec.Struct):
+    """Schema of one entry in precomputed_detailed_results.msgpack."""
+    parameters: ScenarioParameters
+    status: str
+    metrics: dict = {}
+    final_plan: dict[str, list] = {}  # column name -> values, one entry per supplier
+    error: str | None = None
+    timestamp: str = ''
+
+class Scenario(NamedTuple):
+    """Row of the scenarios summary table used by the dashboard."""
+    volume: int
+    risk_weight: float
+    max_share: float
+    min_supplier: int
+    status: str
+    baseline_cost: float
+    optimized_cost: float
+    baseline_emissions: float
+    optimized_emissions: float
+    baseline_deforestation: float
+    optimized_deforestation: float
+    cost_improvement_pct: float
+    emissions_improvement_pct: float
+    deforestation_improvement_pct: float
+    supplier_count: int
+    total_volume_sourced: float
+    baseline_cost_str: str
+    optimized_cost_str: str
+    baseline_emissions_str: str
+    optimized_emissions_str: str
+    baseline_deforestation_str: str
+    optimized_deforestation_str: str
+    error: str | None = None